@@ -1,4 +1,4 @@
-from .menu import BaseStrava, Strava5, ALLERGENS
+from .menu import BaseStrava, Strava5, ALLERGENS, fetch_many
 from ._version import __version__
 
-__all__ = ["BaseStrava", "Strava5", "ALLERGENS", "__version__"]
+__all__ = ["BaseStrava", "Strava5", "ALLERGENS", "fetch_many", "__version__"]
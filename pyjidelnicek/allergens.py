@@ -0,0 +1,26 @@
+"""Czech allergen codes and their names (EU Regulation No 1169/2011)."""
+
+from typing import Dict
+
+ALLERGENS: Dict[str, str] = {
+    "01": "obiloviny obsahující lepek",
+    "01a": "pšenice",
+    "01b": "žito",
+    "01c": "ječmen",
+    "01d": "oves",
+    "01e": "špalda",
+    "01f": "kamut (a hybridní odrůdy)",
+    "02": "korýši",
+    "03": "vejce",
+    "04": "ryby",
+    "05": "podzemnice olejná (arašídy)",
+    "06": "sójové boby (sója)",
+    "07": "mléko",
+    "08": "skořápkové plody",
+    "09": "celer",
+    "10": "hořčice",
+    "11": "sezamová semena",
+    "12": "oxid siřičitý a siřičitany",
+    "13": "vlčí bob (lupina)",
+    "14": "měkkýši",
+}
@@ -4,18 +4,155 @@ This module provides classes for fetching XML menu data from Strava.cz
 cafeteria systems and parsing it into structured Python dictionaries.
 """
 
-import json
-from importlib import resources
+import asyncio
 import re
-import xml.etree.ElementTree as ET
-from datetime import datetime
+from datetime import date
+from typing import Callable, List, Optional, Tuple, Union
+
+from requests import Response, Session
+
+try:
+    import httpx
+except ImportError:  # pragma: no cover - httpx is only needed for fetch_many
+    httpx = None
+
+try:
+    from lxml import etree as ET
+
+    # The menu comes from a remote server: never let libxml2 reach out to
+    # the network while parsing it. Comments and processing instructions
+    # are dropped, as the stdlib parser does.
+    _TARGET_PARSER_OPTIONS = {
+        "no_network": True,
+        "remove_comments": True,
+        "remove_pis": True,
+    }
+    # Trees also never substitute entities from a DTD. Parser targets keep
+    # lxml's default, which only expands internal entities: with entity
+    # resolution off they would receive attribute values with references
+    # such as &amp; still escaped.
+    _PARSER_OPTIONS = {**_TARGET_PARSER_OPTIONS, "resolve_entities": False}
+    # lxml refuses str input carrying an encoding declaration; such text is
+    # fed as UTF-8 bytes with the declared encoding overridden.
+    _STR_PARSER_OPTIONS = {"encoding": "utf-8"}
+    _DAY_BY_DATE = ET.XPath("den[normalize-space(@datum) = $date]")
+except ImportError:  # pragma: no cover - lxml is an optional speedup
+    import xml.etree.ElementTree as ET
+
+    _TARGET_PARSER_OPTIONS = {}
+    _PARSER_OPTIONS = {}
+    _STR_PARSER_OPTIONS = {}
+    _DAY_BY_DATE = None
+
+from .allergens import ALLERGENS
+
+
+_ALLERGEN_KEYS = ALLERGENS.keys()
+
+# A single branch behind a fixed-width look-behind: the stdlib engine scans
+# allergen strings in linear time without backtracking.
+_ALLERGEN_RE = re.compile(r"(?<!\d)\d{2}[a-zA-Z]?")
+_find_allergen_codes = _ALLERGEN_RE.findall
+
+_DATE_RE = re.compile(r"\A(\d{2})-(\d{2})-(\d{4})\Z")
+
+
+def _check_date(target_date: str) -> None:
+    """Raise ValueError unless target_date is a valid DD-MM-YYYY date."""
+    match = _DATE_RE.match(target_date)
+    if match:
+        day, month, year = map(int, match.groups())
+        try:
+            date(year, month, day)
+            return
+        except ValueError:
+            pass
+    raise ValueError(
+        f"Invalid date format. Expected DD-MM-YYYY, got: {target_date}"
+    )
+
+
+def _fromstring(
+    xml_menu: Union[str, bytes], target: Optional["_MenuTarget"] = None
+):
+    """Parse an XML document with whichever ElementTree backend is loaded.
+
+    Bytes are decoded as their XML declaration says. A ``str`` is already
+    decoded, so any declared encoding is ignored, as stdlib ``fromstring``
+    does.
+
+    Returns:
+        The root element, or the result of target when one is given.
+    """
+    if target is None:
+        options = dict(_PARSER_OPTIONS)
+    else:
+        options = dict(_TARGET_PARSER_OPTIONS, target=target)
+    if isinstance(xml_menu, str) and _STR_PARSER_OPTIONS:
+        xml_menu = xml_menu.encode("utf-8")
+        options.update(_STR_PARSER_OPTIONS)
+    parser = ET.XMLParser(**options)
+    parser.feed(xml_menu)
+    return parser.close()
+
+
+def _menu_root(content: bytes) -> ET.Element:
+    """Parse a downloaded menu and check it has the expected root element."""
+    if not content or not content.strip():
+        raise ValueError("Received empty response from the server.")
+
+    root = _fromstring(content)
+    if root.tag != "jidelnicky":
+        raise ValueError(f"Unexpected root element: '{root.tag}'")
+    return root
+
+
+def _find_day(root: ET.Element, target_date: str) -> Optional[ET.Element]:
+    """Return the top-level ``den`` element for target_date, if any.
+
+    Surrounding whitespace in ``datum`` is ignored, as in ``index_days``.
+    lxml elements use the precompiled XPath; stdlib elements are scanned.
+    """
+    if _DAY_BY_DATE is None or not ET.iselement(root):
+        for day in root.findall("den"):
+            if day.get("datum", "").strip() == target_date:
+                return day
+        return None
+    matches = _DAY_BY_DATE(root, date=target_date)
+    return matches[0] if matches else None
 
-from requests import get
 
+class _MenuTarget:
+    """Parser target building the days of a menu straight from XML events.
 
-ALLERGENS: dict[str, str] = json.loads(
-    resources.read_text(__package__, "allergens.json")
-)
+    Top-level ``den`` elements become days and their ``jidlo`` children
+    become meals, without an intermediate element tree.
+    """
+
+    def __init__(self, parse_meal: Callable):
+        self.parse_meal = parse_meal
+        self.days = []
+        self.meals = None
+        self.depth = 0
+
+    def start(self, tag: str, attrib: dict) -> None:
+        self.depth += 1
+        if self.depth == 2:
+            if tag == "den":
+                self.meals = []
+                self.days.append(
+                    {"date": attrib.get("datum").strip(), "meals": self.meals}
+                )
+            else:
+                self.meals = None
+        elif self.depth == 3 and tag == "jidlo" and self.meals is not None:
+            self.meals.append(self.parse_meal(attrib.get))
+
+    def end(self, tag: str) -> None:
+        self.depth -= 1
+
+    def close(self) -> list:
+        return self.days
 
 
 class BaseStrava:
@@ -25,13 +162,39 @@ class BaseStrava:
     codes from menu data.
     """
 
-    def __init__(self, cafeteria_id: int):
+    def __init__(self, cafeteria_id: int, session: Optional[Session] = None):
         """Initialize the parser with a cafeteria ID.
 
         Args:
             cafeteria_id: Unique identifier for the cafeteria.
+            session: HTTP session used for requests. Pass the same session to
+                several parsers to reuse its pooled keep-alive connections.
+                If omitted, a session is created on the first request.
         """
         self.cafeteria_id = cafeteria_id
+        self._session = session
+        self._owns_session = False
+
+    @property
+    def session(self) -> Session:
+        """HTTP session used for requests, created on first use."""
+        if self._session is None:
+            self._session = Session()
+            self._owns_session = True
+        return self._session
+
+    def close(self) -> None:
+        """Close the HTTP session, unless it was passed in by the caller."""
+        if self._owns_session:
+            self._session.close()
+            self._session = None
+            self._owns_session = False
+
+    def __enter__(self) -> "BaseStrava":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
 
     def extract_allergen_codes(self, allergen_str: str) -> list:
         """Extract numeric allergen codes from a string.
@@ -42,10 +205,7 @@ class BaseStrava:
         Returns:
             List of allergen codes (e.g., ['01a', '03', '07']).
         """
-        if not allergen_str or len(allergen_str) == 0:
-            return []
-        codes = re.findall(r"\b\d{2}[a-zA-Z]?|\b\d{2}", allergen_str)
-        return codes
+        return _find_allergen_codes(allergen_str) if allergen_str else []
 
     def allergen_code_to_name(self, code: str) -> str:
         """Convert an allergen code to its human-readable name.
@@ -59,9 +219,10 @@ class BaseStrava:
         Raises:
             ValueError: If the allergen code is not recognized.
         """
-        if code in ALLERGENS:
-            return ALLERGENS[code]
-        raise ValueError(f"Unknown allergen code: {code}")
+        name = ALLERGENS.get(code)
+        if name is None:
+            raise ValueError(f"Unknown allergen code: {code}")
+        return name
 
 
 class Strava5(BaseStrava):
@@ -77,6 +238,37 @@ class Strava5(BaseStrava):
     def url(self) -> str:
         return self.url_template.format(self.cafeteria_id)
 
+    def _download(self) -> Tuple[Response, ET.Element]:
+        """Download the menu and validate its root element.
+
+        Returns:
+            The HTTP response and the parsed root element.
+
+        Raises:
+            ValueError: If the request fails or XML is invalid.
+        """
+        try:
+            response = self.session.get(self.url)
+            response.raise_for_status()
+            return response, _menu_root(response.content)
+
+        except Exception as e:
+            raise ValueError(f"Failed to fetch or parse XML menu: {e}")
+
+    def fetch(self) -> ET.Element:
+        """Fetch the menu from the Strava5 and return its parsed root element.
+
+        The element can be passed straight to ``whole_menu``,
+        ``closest_day_menu`` and ``date_menu`` without parsing it again.
+
+        Returns:
+            Root element of the menu.
+
+        Raises:
+            ValueError: If the request fails or XML is invalid.
+        """
+        return self._download()[1]
+
     def fetch_xml_menu(self) -> str:
         """Fetch the XML menu data from the Strava5.
 
@@ -86,22 +278,52 @@ class Strava5(BaseStrava):
         Raises:
             ValueError: If the request fails or XML is invalid.
         """
-        try:
-            response = get(self.url)
-            response.raise_for_status()
-            xml_text = response.text
-            if not xml_text or len(xml_text.strip()) == 0:
-                raise ValueError("Received empty response from the server.")
+        return self._download()[0].text
+
+    async def fetch_xml_menu_async(self, client: "httpx.AsyncClient") -> str:
+        """Fetch the XML menu data from the Strava5 without blocking.
 
-            root = ET.fromstring(xml_text)
-            if root.tag != "jidelnicky":
-                raise ValueError(f"Unexpected root element: '{root.tag}'")
+        Args:
+            client: httpx async client used for the request. Share one client
+                between cafeterias to reuse its connection pool.
 
-            return xml_text
+        Returns:
+            Raw XML string containing menu data.
+
+        Raises:
+            ValueError: If the request fails or XML is invalid.
+        """
+        try:
+            response = await client.get(self.url)
+            response.raise_for_status()
+            _menu_root(response.content)
+            return response.text
 
         except Exception as e:
             raise ValueError(f"Failed to fetch or parse XML menu: {e}")
 
+    def parse(self, xml_menu: Union[str, bytes]) -> ET.Element:
+        """Parse raw XML menu data into its root element.
+
+        The returned element can be passed to ``whole_menu``,
+        ``closest_day_menu`` and ``date_menu`` to query the same menu
+        several times without re-parsing it. When downloading the menu,
+        ``fetch`` returns the element directly.
+
+        Args:
+            xml_menu: Raw XML string or bytes.
+
+        Returns:
+            Root element of the menu.
+
+        Raises:
+            ValueError: If XML parsing fails.
+        """
+        try:
+            return _fromstring(xml_menu)
+        except ET.ParseError as e:
+            raise ValueError(f"Failed to parse XML: {e}")
+
     def parse_day(
         self, day_element: ET.Element, lookup_allergens: bool = False
     ) -> dict:
@@ -113,34 +335,75 @@ class Strava5(BaseStrava):
 
         Returns:
             Dictionary containing date and meals for the day.
+
+        Raises:
+            ValueError: If an allergen code is not recognized.
         """
-        day = {"date": day_element.get("datum").strip(), "meals": []}
-        for meal in day_element.findall("jidlo"):
-            raw_allergens = meal.get("alergeny", "")
-            if len(raw_allergens) > 0:
-                allergens = self.extract_allergen_codes(raw_allergens)
-                if lookup_allergens:
-                    allergens = [
-                        self.allergen_code_to_name(code) for code in allergens
-                    ]
-            else:
-                allergens = []
-            day["meals"].append(
-                {
-                    "name": meal.get("nazev", "").strip().lower(),
-                    "type": meal.get("druh", "").strip().lower(),
-                    "allergens": allergens,
-                }
-            )
-        return day
+        if lookup_allergens:
+            return self._parse_day_named(day_element)
+        return self._parse_day_raw(day_element)
+
+    def _parse_day_raw(self, day_element: ET.Element) -> dict:
+        """Parse a single day element, keeping allergen codes."""
+        parse_meal = self._parse_meal_raw
+        return {
+            "date": day_element.get("datum").strip(),
+            "meals": [
+                parse_meal(meal.get) for meal in day_element.findall("jidlo")
+            ],
+        }
+
+    def _parse_day_named(self, day_element: ET.Element) -> dict:
+        """Parse a single day element, converting allergen codes to names."""
+        parse_meal = self._parse_meal_named
+        return {
+            "date": day_element.get("datum").strip(),
+            "meals": [
+                parse_meal(meal.get) for meal in day_element.findall("jidlo")
+            ],
+        }
+
+    def _parse_meal_raw(self, get: Callable) -> dict:
+        """Build a meal from its attribute getter, keeping allergen codes."""
+        raw_allergens = get("alergeny", "")
+        return {
+            "name": get("nazev", "").strip().lower(),
+            "type": get("druh", "").strip().lower(),
+            "allergens": (
+                self.extract_allergen_codes(raw_allergens)
+                if raw_allergens
+                else []
+            ),
+        }
+
+    def _parse_meal_named(self, get: Callable) -> dict:
+        """Build a meal from its attribute getter, naming its allergens."""
+        raw_allergens = get("alergeny", "")
+        if raw_allergens:
+            codes = self.extract_allergen_codes(raw_allergens)
+            missing = set(codes) - _ALLERGEN_KEYS
+            if missing:
+                raise ValueError(
+                    f"Unknown allergen code: {', '.join(sorted(missing))}"
+                )
+            allergens = list(map(ALLERGENS.__getitem__, codes))
+        else:
+            allergens = []
+        return {
+            "name": get("nazev", "").strip().lower(),
+            "type": get("druh", "").strip().lower(),
+            "allergens": allergens,
+        }
 
     def whole_menu(
-        self, xml_menu: str, lookup_allergens: bool = False
+        self,
+        xml_menu: Union[str, bytes, ET.Element],
+        lookup_allergens: bool = False,
     ) -> dict:
         """Parse the complete menu from XML.
 
         Args:
-            xml_menu: Raw XML string.
+            xml_menu: Raw XML string or bytes, or a parsed root element.
             lookup_allergens: If True, convert allergen codes to names.
 
         Returns:
@@ -150,22 +413,34 @@ class Strava5(BaseStrava):
             ValueError: If XML parsing fails.
         """
         try:
-            root = ET.fromstring(xml_menu)
-            menu = {"cafeteria_id": self.cafeteria_id, "days": []}
-            for day_element in root.findall("den"):
-                day = self.parse_day(day_element, lookup_allergens)
-                menu["days"].append(day)
-            return menu
+            if not isinstance(xml_menu, (str, bytes)):
+                if lookup_allergens:
+                    parse_day = self._parse_day_named
+                else:
+                    parse_day = self._parse_day_raw
+                days = [
+                    parse_day(day_element)
+                    for day_element in xml_menu.findall("den")
+                ]
+            else:
+                if lookup_allergens:
+                    parse_meal = self._parse_meal_named
+                else:
+                    parse_meal = self._parse_meal_raw
+                days = _fromstring(xml_menu, target=_MenuTarget(parse_meal))
+            return {"cafeteria_id": self.cafeteria_id, "days": days}
         except ET.ParseError as e:
             raise ValueError(f"Failed to parse XML: {e}")
 
     def closest_day_menu(
-        self, xml_menu: str, lookup_allergens: bool = False
+        self,
+        xml_menu: Union[str, bytes, ET.Element],
+        lookup_allergens: bool = False,
     ) -> dict:
         """Get the menu of the closest day from the XML.
 
         Args:
-            xml_menu: Raw XML string.
+            xml_menu: Raw XML string or bytes, or a parsed root element.
             lookup_allergens: If True, convert allergen codes to names.
 
         Returns:
@@ -175,7 +450,11 @@ class Strava5(BaseStrava):
             ValueError: If no day elements found or XML parsing fails.
         """
         try:
-            root = ET.fromstring(xml_menu)
+            root = (
+                _fromstring(xml_menu)
+                if isinstance(xml_menu, (str, bytes))
+                else xml_menu
+            )
             day_element = root.find("den")
             if day_element is None:
                 raise ValueError("No 'den' element found in the XML menu.")
@@ -185,12 +464,15 @@ class Strava5(BaseStrava):
             raise ValueError(f"Failed to parse XML: {e}")
 
     def date_menu(
-        self, xml_menu: str, target_date: str, lookup_allergens: bool = False
+        self,
+        xml_menu: Union[str, bytes, ET.Element],
+        target_date: str,
+        lookup_allergens: bool = False,
     ) -> dict:
         """Get menu for a specific date.
 
         Args:
-            xml_menu: Raw XML string.
+            xml_menu: Raw XML string or bytes, or a parsed root element.
             target_date: Date in DD-MM-YYYY format (e.g., '01-01-1970').
             lookup_allergens: If True, convert allergen codes to names.
 
@@ -200,20 +482,95 @@ class Strava5(BaseStrava):
         Raises:
             ValueError: If XML parsing fails or date format is invalid.
         """
+        _check_date(target_date)
         try:
-            datetime.strptime(target_date, "%d-%m-%Y")
-
-            root = ET.fromstring(xml_menu)
-            day_element = root.find(f"den[@datum='{target_date}']")
+            root = (
+                _fromstring(xml_menu)
+                if isinstance(xml_menu, (str, bytes))
+                else xml_menu
+            )
+            day_element = _find_day(root, target_date)
             if day_element is None:
                 return {}
             return self.parse_day(day_element, lookup_allergens)
 
-        except ValueError as e:
-            if "time data" in str(e):
-                raise ValueError(
-                    f"Invalid date format. Expected DD-MM-YYYY, got: {target_date}"
-                )
-            raise
         except ET.ParseError as e:
             raise ValueError(f"Failed to parse XML: {e}")
+
+    def index_days(self, xml_menu: Union[str, bytes, ET.Element]) -> dict:
+        """Index the days of the menu by their date.
+
+        Build the index once when querying many dates from the same menu;
+        each ``date_menu_from_index`` call is then a dictionary lookup
+        instead of a scan over all days.
+
+        Args:
+            xml_menu: Raw XML string or bytes, or a parsed root element.
+
+        Returns:
+            Dictionary mapping dates in DD-MM-YYYY format to day elements.
+            If a date appears more than once, its first day is kept, as in
+            ``date_menu``.
+
+        Raises:
+            ValueError: If XML parsing fails.
+        """
+        root = (
+            self.parse(xml_menu)
+            if isinstance(xml_menu, (str, bytes))
+            else xml_menu
+        )
+        index = {}
+        for day in root.findall("den"):
+            index.setdefault(day.get("datum").strip(), day)
+        return index
+
+    def date_menu_from_index(
+        self, index: dict, target_date: str, lookup_allergens: bool = False
+    ) -> dict:
+        """Get menu for a specific date from an index built by ``index_days``.
+
+        Args:
+            index: Dictionary returned by ``index_days``.
+            target_date: Date in DD-MM-YYYY format (e.g., '01-01-1970').
+            lookup_allergens: If True, convert allergen codes to names.
+
+        Returns:
+            Dictionary representing the day's menu, or empty dict if date not found.
+
+        Raises:
+            ValueError: If the date format is invalid.
+        """
+        _check_date(target_date)
+        day_element = index.get(target_date)
+        if day_element is None:
+            return {}
+        return self.parse_day(day_element, lookup_allergens)
+
+
+async def fetch_many(cafeteria_ids: List[int]) -> List[str]:
+    """Fetch the Strava5 menus of several cafeterias concurrently.
+
+    Requires the optional ``httpx`` dependency.
+
+    Args:
+        cafeteria_ids: Unique identifiers of the cafeterias.
+
+    Returns:
+        Raw XML strings, in the same order as cafeteria_ids.
+
+    Raises:
+        ImportError: If httpx is not installed.
+        ValueError: If any request fails or its XML is invalid.
+    """
+    if httpx is None:
+        raise ImportError(
+            "fetch_many requires httpx: pip install 'pyjidelnicek[async]'"
+        )
+    async with httpx.AsyncClient() as client:
+        return await asyncio.gather(
+            *(
+                Strava5(cafeteria_id).fetch_xml_menu_async(client)
+                for cafeteria_id in cafeteria_ids
+            )
+        )
@@ -23,6 +23,9 @@ class TestBaseStrava:
             ("No allergens here", []),
             ("01a", ["01a"]),
             ("07 -Mléko", ["07"]),
+            ("01a03b", ["01a", "03b"]),
+            ("Obiloviny01a", ["01a"]),
+            ("1234", ["12"]),
         ],
     )
     def test_extract_allergen_codes(self, base_strava, allergen_str, expected):
@@ -1,8 +1,10 @@
+import asyncio
 import pytest
-from unittest.mock import Mock, patch
+from unittest.mock import AsyncMock, MagicMock, Mock, patch
 import xml.etree.ElementTree as ET
+from requests import Session
 from requests.exceptions import RequestException
-from pyjidelnicek.menu import Strava5
+from pyjidelnicek.menu import Strava5, fetch_many
 
 
 class TestStrava5:
@@ -14,15 +16,49 @@ class TestStrava5:
         assert s5.cafeteria_id == 4857
         assert "4857" in s5.url
 
+    def test_shared_session(self):
+        """Test parsers sharing one HTTP session."""
+        session = Session()
+        assert Strava5(1, session=session).session is session
+        assert Strava5(2, session=session).session is session
+        assert Strava5(3).session is not session
+
+    def test_session_created_lazily(self):
+        """Test that a session is only created when first needed."""
+        s5 = Strava5(4857)
+        assert s5._session is None
+
+        session = s5.session
+        assert isinstance(session, Session)
+        assert s5.session is session
+
+    def test_close_owned_session(self):
+        """Test closing a parser closes the session it created."""
+        with patch("pyjidelnicek.menu.Session.close") as mock_close:
+            with Strava5(4857) as s5:
+                s5.session
+            mock_close.assert_called_once_with()
+        assert s5._session is None
+
+    def test_close_keeps_shared_session(self):
+        """Test closing a parser leaves a caller's session open."""
+        session = Session()
+        with patch.object(session, "close") as mock_close:
+            with Strava5(4857, session=session) as s5:
+                s5.session
+            mock_close.assert_not_called()
+        assert s5.session is session
+
     def test_url_property(self, strava5):
         """Test URL property generation."""
         expected = "https://www.strava.cz/strava5/Jidelnicky/XML?zarizeni=4857"
         assert strava5.url == expected
 
-    @patch("pyjidelnicek.menu.get")
+    @patch("pyjidelnicek.menu.Session.get")
     def test_fetch_xml_menu_success(self, mock_get, strava5, sample_xml):
         """Test successful XML menu fetching."""
         mock_response = Mock()
+        mock_response.content = sample_xml.encode("utf-8")
         mock_response.text = sample_xml
         mock_response.raise_for_status.return_value = None
         mock_get.return_value = mock_response
@@ -31,7 +67,21 @@ class TestStrava5:
         assert result == sample_xml
         mock_get.assert_called_once_with(strava5.url)
 
-    @patch("pyjidelnicek.menu.get")
+    @patch("pyjidelnicek.menu.Session.get")
+    def test_fetch(self, mock_get, strava5, sample_xml):
+        """Test menu fetching returning the parsed root element."""
+        mock_response = Mock()
+        mock_response.content = sample_xml.encode("utf-8")
+        mock_response.text = sample_xml
+        mock_response.raise_for_status.return_value = None
+        mock_get.return_value = mock_response
+
+        root = strava5.fetch()
+        assert root.tag == "jidelnicky"
+        assert strava5.whole_menu(root) == strava5.whole_menu(sample_xml)
+        mock_get.assert_called_once_with(strava5.url)
+
+    @patch("pyjidelnicek.menu.Session.get")
     def test_fetch_xml_menu_http_error(self, mock_get, strava5):
         """Test XML menu fetching with HTTP error."""
         mock_response = Mock()
@@ -45,29 +95,139 @@ class TestStrava5:
         ):
             strava5.fetch_xml_menu()
 
-    @patch("pyjidelnicek.menu.get")
+    @patch("pyjidelnicek.menu.Session.get")
     def test_fetch_xml_menu_empty_response(self, mock_get, strava5):
         """Test XML menu fetching with empty response."""
         mock_response = Mock()
-        mock_response.text = ""
+        mock_response.content = b""
         mock_response.raise_for_status.return_value = None
         mock_get.return_value = mock_response
 
         with pytest.raises(ValueError, match="Received empty response"):
             strava5.fetch_xml_menu()
 
-    @patch("pyjidelnicek.menu.get")
+    @patch("pyjidelnicek.menu.Session.get")
     def test_fetch_xml_menu_invalid_root(self, mock_get, strava5):
         """Test XML menu fetching with invalid root element."""
         invalid_xml = "<invalid>content</invalid>"
         mock_response = Mock()
-        mock_response.text = invalid_xml
+        mock_response.content = invalid_xml.encode("utf-8")
         mock_response.raise_for_status.return_value = None
         mock_get.return_value = mock_response
 
         with pytest.raises(ValueError, match="Unexpected root element"):
             strava5.fetch_xml_menu()
 
+    def test_fetch_xml_menu_async(self, strava5, sample_xml):
+        """Test asynchronous XML menu fetching."""
+        mock_response = Mock()
+        mock_response.content = sample_xml.encode("utf-8")
+        mock_response.text = sample_xml
+        mock_response.raise_for_status.return_value = None
+        client = Mock()
+        client.get = AsyncMock(return_value=mock_response)
+
+        result = asyncio.run(strava5.fetch_xml_menu_async(client))
+        assert result == sample_xml
+        client.get.assert_awaited_once_with(strava5.url)
+
+    def test_fetch_xml_menu_async_invalid_root(self, strava5):
+        """Test asynchronous XML menu fetching with invalid root element."""
+        mock_response = Mock()
+        mock_response.content = b"<invalid>content</invalid>"
+        mock_response.raise_for_status.return_value = None
+        client = Mock()
+        client.get = AsyncMock(return_value=mock_response)
+
+        with pytest.raises(ValueError, match="Unexpected root element"):
+            asyncio.run(strava5.fetch_xml_menu_async(client))
+
+    @patch("pyjidelnicek.menu.httpx")
+    def test_fetch_many(self, mock_httpx, sample_xml):
+        """Test fetching several cafeterias over one shared client."""
+        mock_response = Mock()
+        mock_response.content = sample_xml.encode("utf-8")
+        mock_response.text = sample_xml
+        mock_response.raise_for_status.return_value = None
+        client = MagicMock()
+        client.get = AsyncMock(return_value=mock_response)
+        mock_httpx.AsyncClient.return_value.__aenter__.return_value = client
+
+        result = asyncio.run(fetch_many([4857, 1234]))
+        assert result == [sample_xml, sample_xml]
+        assert [c.args[0] for c in client.get.await_args_list] == [
+            Strava5(4857).url,
+            Strava5(1234).url,
+        ]
+
+    @patch("pyjidelnicek.menu.httpx", None)
+    def test_fetch_many_without_httpx(self):
+        """Test fetch_many without the optional httpx dependency."""
+        with pytest.raises(ImportError, match="requires httpx"):
+            asyncio.run(fetch_many([4857]))
+
+    def test_parse(self, strava5, sample_xml):
+        """Test parsing XML into a reusable root element."""
+        root = strava5.parse(sample_xml)
+
+        assert root.tag == "jidelnicky"
+        assert strava5.whole_menu(root) == strava5.whole_menu(sample_xml)
+        assert strava5.closest_day_menu(root)["date"] == "23-06-2025"
+        assert strava5.date_menu(root, "24-06-2025")["date"] == "24-06-2025"
+
+    def test_stdlib_root_element(self, strava5, sample_xml):
+        """Test querying a root element built by xml.etree.ElementTree."""
+        root = ET.fromstring(sample_xml.encode("utf-8"))
+
+        assert strava5.whole_menu(root) == strava5.whole_menu(sample_xml)
+        assert strava5.closest_day_menu(root)["date"] == "23-06-2025"
+        assert strava5.date_menu(root, "24-06-2025") == strava5.date_menu(
+            sample_xml, "24-06-2025"
+        )
+        assert list(strava5.index_days(root)) == list(
+            strava5.index_days(sample_xml)
+        )
+
+    def test_bytes_input(self, strava5, sample_xml):
+        """Test querying raw XML passed as bytes."""
+        xml_bytes = sample_xml.encode("utf-8")
+
+        assert strava5.whole_menu(xml_bytes) == strava5.whole_menu(sample_xml)
+        assert strava5.closest_day_menu(xml_bytes)["date"] == "23-06-2025"
+        assert strava5.date_menu(xml_bytes, "24-06-2025")["meals"]
+
+    def test_str_input_ignores_declared_encoding(self, strava5):
+        """Test that decoded text is not re-decoded as its declaration says."""
+        xml = (
+            '<?xml version="1.0" encoding="windows-1250"?>'
+            '<jidelnicky><den datum="23-06-2025">'
+            '<jidlo nazev="Rajčatová" druh="Polévka" /></den></jidelnicky>'
+        )
+        assert strava5.parse(xml)[0][0].get("nazev") == "Rajčatová"
+        assert strava5.whole_menu(xml)["days"][0]["meals"][0]["name"] == (
+            "rajčatová"
+        )
+        assert strava5.closest_day_menu(xml)["meals"][0]["name"] == (
+            "rajčatová"
+        )
+
+    def test_bytes_input_honours_declared_encoding(self, strava5):
+        """Test that bytes are decoded as their XML declaration says."""
+        xml = (
+            '<?xml version="1.0" encoding="windows-1250"?>'
+            '<jidelnicky><den datum="23-06-2025">'
+            '<jidlo nazev="Rajčatová" druh="Polévka" /></den></jidelnicky>'
+        ).encode("cp1250")
+        assert strava5.whole_menu(xml)["days"][0]["meals"][0]["name"] == (
+            "rajčatová"
+        )
+        assert strava5.parse(xml)[0][0].get("nazev") == "Rajčatová"
+
+    def test_parse_invalid_xml(self, strava5):
+        """Test parsing invalid XML."""
+        with pytest.raises(ValueError, match="Failed to parse XML"):
+            strava5.parse("invalid xml")
+
     def test_parse_day_basic(self, strava5, sample_day_element):
         """Test basic day parsing."""
         result = strava5.parse_day(sample_day_element, lookup_allergens=False)
@@ -89,6 +249,23 @@ class TestStrava5:
             "pšenice" in allergen.lower() for allergen in meal["allergens"]
         )
 
+    def test_parse_day_unknown_allergen(self, strava5):
+        """Test day parsing with an unknown allergen code."""
+        day_element = ET.fromstring(
+            '<den datum="23-06-2025"><jidlo nazev="x" alergeny="99" /></den>'
+        )
+        with pytest.raises(ValueError, match="Unknown allergen code: 99"):
+            strava5.parse_day(day_element, lookup_allergens=True)
+
+    def test_parse_day_several_unknown_allergens(self, strava5):
+        """Test day parsing reports every unknown allergen code at once."""
+        day_element = ET.fromstring(
+            '<den datum="23-06-2025"><jidlo nazev="x" alergeny="99,01,98" />'
+            "</den>"
+        )
+        with pytest.raises(ValueError, match="Unknown allergen code: 98, 99"):
+            strava5.parse_day(day_element, lookup_allergens=True)
+
     def test_whole_menu(self, strava5, sample_xml):
         """Test complete menu parsing."""
         result = strava5.whole_menu(sample_xml)
@@ -98,6 +275,82 @@ class TestStrava5:
         assert result["days"][0]["date"] == "23-06-2025"
         assert result["days"][1]["date"] == "24-06-2025"
 
+    def test_whole_menu_with_allergen_lookup(self, strava5, sample_xml):
+        """Test complete menu parsing with allergen name lookup."""
+        result = strava5.whole_menu(sample_xml, lookup_allergens=True)
+
+        assert result == strava5.whole_menu(
+            strava5.parse(sample_xml), lookup_allergens=True
+        )
+        assert result["days"][1]["meals"][1]["allergens"] == [
+            "pšenice",
+            "vejce",
+            "mléko",
+        ]
+
+    def test_whole_menu_unknown_allergen(self, strava5):
+        """Test complete menu parsing with an unknown allergen code."""
+        xml = (
+            '<jidelnicky><den datum="23-06-2025">'
+            '<jidlo nazev="x" alergeny="99" /></den></jidelnicky>'
+        )
+        with pytest.raises(ValueError, match="Unknown allergen code: 99"):
+            strava5.whole_menu(xml, lookup_allergens=True)
+
+    def test_whole_menu_ignores_comments(self, strava5):
+        """Test that comments do not show up as days or meals."""
+        xml = (
+            '<jidelnicky><!-- week 26 --><den datum="23-06-2025">'
+            '<!-- soup --><jidlo nazev="Rajčatová" druh="Polévka" />'
+            "</den></jidelnicky>"
+        )
+        for menu in (xml, strava5.parse(xml)):
+            result = strava5.whole_menu(menu)
+            assert len(result["days"]) == 1
+            assert result["days"][0]["meals"][0]["name"] == "rajčatová"
+
+    def test_whole_menu_skips_non_day_children(self, strava5):
+        """Test that root children other than days are skipped."""
+        xml = (
+            '<jidelnicky><info verze="5" /><den datum="23-06-2025">'
+            '<jidlo nazev="Rajčatová" druh="Polévka" /></den></jidelnicky>'
+        )
+        result = strava5.whole_menu(xml)
+
+        assert [day["date"] for day in result["days"]] == ["23-06-2025"]
+        assert strava5.whole_menu(strava5.parse(xml)) == result
+        assert strava5.whole_menu(ET.fromstring(xml.encode("utf-8"))) == result
+
+    def test_lxml_root_with_comments(self, strava5):
+        """Test a caller's lxml tree that keeps comments and PIs."""
+        etree = pytest.importorskip("lxml.etree")
+        xml = (
+            '<jidelnicky><den datum="23-06-2025"><!-- soup --><?pi x?>'
+            '<jidlo nazev="Rajčatová" druh="Polévka" /><info verze="5" />'
+            "</den></jidelnicky>"
+        ).encode("utf-8")
+        root = etree.fromstring(xml)
+
+        result = strava5.whole_menu(root)
+        assert result == strava5.whole_menu(xml)
+        meals = result["days"][0]["meals"]
+        assert [meal["name"] for meal in meals] == ["rajčatová"]
+        assert strava5.closest_day_menu(root, lookup_allergens=True)["meals"]
+
+    def test_whole_menu_entity_references(self, strava5):
+        """Test that escaped characters in names are decoded on every path."""
+        xml = (
+            '<jidelnicky><den datum="23-06-2025">'
+            '<jidlo nazev="Kuře &amp; r&#253;že &#x26; salát" druh="Oběd" />'
+            "</den></jidelnicky>"
+        )
+        result = strava5.whole_menu(xml)
+
+        meal = result["days"][0]["meals"][0]
+        assert meal["name"] == "kuře & rýže & salát"
+        assert strava5.whole_menu(strava5.parse(xml)) == result
+        assert strava5.whole_menu(xml.encode("utf-8")) == result
+
     def test_whole_menu_invalid_xml(self, strava5):
         """Test whole menu parsing with invalid XML."""
         with pytest.raises(ValueError, match="Failed to parse XML"):
@@ -129,12 +382,70 @@ class TestStrava5:
         result = strava5.date_menu(sample_xml, "01-01-1970")
         assert result == {}
 
-    def test_date_menu_invalid_format(self, strava5, sample_xml):
+    @pytest.mark.parametrize(
+        "target_date", ["2025-06-20", "31-02-2025", "24-06-2025 ", "1-1-2025"]
+    )
+    def test_date_menu_invalid_format(self, strava5, sample_xml, target_date):
         """Test date menu with invalid date format."""
         with pytest.raises(ValueError, match="Invalid date format"):
-            strava5.date_menu(sample_xml, "2025-06-20")
+            strava5.date_menu(sample_xml, target_date)
 
     def test_date_menu_invalid_xml(self, strava5):
         """Test date menu with invalid XML."""
         with pytest.raises(ValueError, match="Failed to parse XML"):
             strava5.date_menu("invalid xml", "20-06-2025")
+
+    def test_index_days(self, strava5, sample_xml):
+        """Test indexing days by date."""
+        index = strava5.index_days(sample_xml)
+
+        assert list(index) == [
+            "23-06-2025",
+            "24-06-2025",
+            "25-06-2025",
+            "26-06-2025",
+            "27-06-2025",
+        ]
+
+    def test_date_menu_from_index(self, strava5, sample_xml):
+        """Test date menu lookups against a prebuilt index."""
+        index = strava5.index_days(strava5.parse(sample_xml))
+
+        result = strava5.date_menu_from_index(index, "24-06-2025")
+        assert result == strava5.date_menu(sample_xml, "24-06-2025")
+        assert strava5.date_menu_from_index(index, "01-01-1970") == {}
+
+    def test_date_menu_padded_date(self, strava5):
+        """Test that date lookups ignore whitespace around the date."""
+        xml = (
+            '<jidelnicky><den datum=" 23-06-2025 ">'
+            '<jidlo nazev="Rajčatová" druh="Polévka" /></den></jidelnicky>'
+        )
+        index = strava5.index_days(xml)
+
+        result = strava5.date_menu(xml, "23-06-2025")
+        assert result["date"] == "23-06-2025"
+        assert result == strava5.date_menu_from_index(index, "23-06-2025")
+        assert result == strava5.date_menu(
+            ET.fromstring(xml.encode("utf-8")), "23-06-2025"
+        )
+
+    def test_date_menu_duplicate_date(self, strava5):
+        """Test that both date lookups return the first of duplicate days."""
+        xml = (
+            '<jidelnicky><den datum="23-06-2025">'
+            '<jidlo nazev="První" druh="Polévka" /></den>'
+            '<den datum="23-06-2025">'
+            '<jidlo nazev="Druhá" druh="Polévka" /></den></jidelnicky>'
+        )
+        index = strava5.index_days(xml)
+
+        result = strava5.date_menu(xml, "23-06-2025")
+        assert result["meals"][0]["name"] == "první"
+        assert result == strava5.date_menu_from_index(index, "23-06-2025")
+
+    def test_date_menu_from_index_invalid_format(self, strava5, sample_xml):
+        """Test indexed date menu with invalid date format."""
+        index = strava5.index_days(sample_xml)
+        with pytest.raises(ValueError, match="Invalid date format"):
+            strava5.date_menu_from_index(index, "2025-06-24")